@@ -1,46 +1,58 @@
 from __future__ import annotations
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
-from typing import Dict
+from typing import Any, Dict
 from pathlib import Path
 
 from config import settings
+from .config import MODULES_ORDER, MODULES_META
+from .modules import get_router_for, list_modules
+
+
 
+app = FastAPI(title="WordQuiz API", default_response_class=ORJSONResponse)
 
 
-app = FastAPI(title="WordQuiz API")
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets clients and proxies cache audio between sessions."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = f"public, max-age={settings.STATIC_CACHE_MAX_AGE}"
+        return response
+
 
 # === Статика (аудио) ===
 # Положи файлы в backend/static/audio/*.ogg | *.mp3
+# В продакшене /static лучше отдавать через nginx (см. README), здесь — для dev.
 static_dir = Path(settings.AUDIO_OUTPUT_DIR)
-app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
-
-from .config import MODULES_ORDER, MODULES_META
-from .modules import get_router_for, list_modules
-
+app.mount("/static", CachedStaticFiles(directory=str(static_dir)), name="static")
 
 @app.get("/health")
-def health():
+async def health():
     return {"ok": True}
 
 
+# The module list is static for the lifetime of the process
+MODULES = list_modules(MODULES_ORDER, MODULES_META)
+
+
 @app.get("/modules")
-def list_available_modules():
-    return {"modules": list_modules(MODULES_ORDER, MODULES_META)}
+async def list_available_modules():
+    return {"modules": MODULES}
 
 
 # Include routers for each module under /modules/<slug>
+module_routers: Dict[str, Any] = {}
 for slug in MODULES_ORDER:
     try:
-        router = get_router_for(slug)
+        module_routers[slug] = get_router_for(slug)
     except Exception:
         continue
-    app.include_router(router, prefix=f"/modules/{slug}")
-
-# Keep legacy endpoints for the first module (nationalities) at root
-try:
-    legacy_router = get_router_for(MODULES_ORDER[0])
-    app.include_router(legacy_router)
-except Exception:
-    pass
+    app.include_router(module_routers[slug], prefix=f"/modules/{slug}")
 
+# Keep legacy endpoints for the first module (nationalities) at root,
+# reusing the router resolved above
+if MODULES_ORDER and MODULES_ORDER[0] in module_routers:
+    app.include_router(module_routers[MODULES_ORDER[0]])
@@ -1,15 +1,20 @@
 from __future__ import annotations
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Optional
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from typing import List, Dict, Optional, Tuple
 from uuid import uuid4, UUID
+from contextlib import asynccontextmanager
 from pathlib import Path
+import functools
+import operator
 import random
-import json
 import os
 
+from cachetools import TTLCache
+from pydantic import BaseModel
+
 from config import settings
 from ...schemas import (
-    Card,
     Question,
     QuizSession,
     StartQuizIn,
@@ -21,126 +26,234 @@ from ...schemas import (
     SummaryOut,
 )
 
-router = APIRouter()
-
-# Session storage is module-local
-SESSIONS: Dict[UUID, QuizSession] = {}
+# Session storage is module-local and bounded: abandoned sessions expire after
+# SESSION_TTL seconds and the oldest are evicted once SESSION_MAX_COUNT is reached.
+# Handlers are async and never await while touching it, so no lock is needed.
+SESSIONS: TTLCache = TTLCache(maxsize=settings.SESSION_MAX_COUNT, ttl=settings.SESSION_TTL)
+# Finished sessions only need to live long enough for the summary to be fetched
+FINISHED_SESSIONS: TTLCache = TTLCache(
+    maxsize=settings.SESSION_MAX_COUNT, ttl=settings.SESSION_FINISHED_TTL
+)
 
 # Data file for this module
 DATA_FILE = Path(__file__).resolve().parents[2] / "data" / "nationalies" / "questions.json"
 
 
+STATIC_ROOT_STR = os.fspath(settings.AUDIO_OUTPUT_DIR)
+STATIC_IS_AUDIO = os.path.basename(os.path.normpath(STATIC_ROOT_STR)) == "audio"
+STATIC_URL_PREFIX = "/static/" if STATIC_IS_AUDIO else "/static/audio/"
+
+
+@functools.cache
+def _audio_index() -> frozenset:
+    """Relative paths (with '/') of every file under the static audio root.
+
+    Scanned once so URL resolution is a set lookup instead of stat() calls;
+    call reload_audio_index() after adding or removing audio files.
+    """
+    found = set()
+    for dirpath, _dirnames, filenames in os.walk(STATIC_ROOT_STR):
+        rel_dir = os.path.relpath(dirpath, STATIC_ROOT_STR)
+        for name in filenames:
+            rel = name if rel_dir == "." else os.path.join(rel_dir, name)
+            found.add(rel.replace(os.sep, "/"))
+    return frozenset(found)
+
+
+def reload_audio_index() -> None:
+    """Rescan the audio directory and re-resolve every memoized audio URL."""
+    _audio_index.cache_clear()
+    AUDIO_URL_CACHE.clear()
+    _warm_audio_url_cache.cache_clear()
+    _warm_audio_url_cache()
+
+
+def _resolve_audio_url(path: str) -> str:
+    if not path.startswith("audio/"):
+        return path
+    rel = path.removeprefix("audio/")
+    index = _audio_index()
+    if rel in index:
+        return STATIC_URL_PREFIX + rel
+    stem, ext = os.path.splitext(rel)
+    for v in (f"{stem}_country{ext}", f"{stem}_answer{ext}"):
+        if v in index:
+            return STATIC_URL_PREFIX + v
+    if STATIC_IS_AUDIO:
+        return f"/static/{rel}"
+    return f"/static/{path}"
+
+
+# Resolved static URLs keyed by data-file audio path, filled in after loading questions
+AUDIO_URL_CACHE: Dict[str, str] = {}
+
+
 def _audio_url(path: Optional[str]) -> Optional[str]:
     if not path:
         return None
-    if path.startswith("audio/"):
-        static_root = Path(settings.AUDIO_OUTPUT_DIR)
-        rel = path.split('/', 1)[1]
-        candidate = static_root / rel
-        if candidate.exists():
-            if static_root.name == "audio":
-                return f"/static/{rel}"
-            return f"/static/audio/{rel}"
-        stem = Path(rel).stem
-        ext = Path(rel).suffix
-        variants = [f"{stem}_country{ext}", f"{stem}_answer{ext}"]
-        for v in variants:
-            cand = static_root / v
-            if cand.exists():
-                if static_root.name == "audio":
-                    return f"/static/{v}"
-                return f"/static/audio/{v}"
-        if static_root.name == "audio":
-            return f"/static/{rel}"
-        return f"/static/{path}"
-    return path
-
-
-def load_questions() -> Dict[int, dict]:
-    raw_questions: Dict[int, dict] = {}
+    url = AUDIO_URL_CACHE.get(path)
+    if url is None:
+        url = AUDIO_URL_CACHE[path] = _resolve_audio_url(path)
+    return url
+
+
+class _RawItem(BaseModel):
+    id: int
+    country: Optional[str] = None
+    answer: Optional[str] = None
+    audio: Optional[str] = None
+
+
+class _RawFile(BaseModel):
+    base_question: str = "Назови национальность в стране"
+    default_options: int = 4
+    questions: List[_RawItem] = []
+
+
+def _read_data_file() -> _RawFile:
     if not DATA_FILE.exists():
-        return raw_questions
-    with DATA_FILE.open(encoding="utf-8") as f:
-        raw = json.load(f)
-    base_prompt = raw.get("base_question", "Назови национальность в стране")
-    items = raw.get("questions", [])
-    for it in items:
-        qid = int(it.get("id"))
-        country = it.get("country")
-        prompt = f"{base_prompt}:" if country else base_prompt
-        answer_text = it.get("answer")
-        prompt_audio = it.get("audio")
-        raw_questions[qid] = {
-            "id": qid,
-            "default_options": raw.get("default_options", 4),
+        return _RawFile()
+    # validate straight from bytes, without an intermediate dict
+    return _RawFile.model_validate_json(DATA_FILE.read_bytes())
+
+
+def load_questions(raw: _RawFile) -> Dict[int, dict]:
+    raw_questions: Dict[int, dict] = {}
+    base_prompt = raw.base_question
+    for it in raw.questions:
+        prompt = f"{base_prompt}:" if it.country else base_prompt
+        raw_questions[it.id] = {
+            "id": it.id,
             "prompt_text": prompt,
-            "prompt_audio": prompt_audio,
-            "answer": answer_text,
-            "country": country,
+            "prompt_audio": it.audio,
+            "answer": it.answer,
+            # audio played when this question's answer is shown as an option
+            "answer_audio": f"audio/q{it.id}_answer.mp3",
+            "country": it.country,
         }
     return raw_questions
 
 
-RAW_QUESTIONS = load_questions()
+# The data file is parsed once at import; request handlers only read these
+RAW_DATA = _read_data_file()
+RAW_QUESTIONS = load_questions(RAW_DATA)
+DEFAULT_OPTIONS: int = RAW_DATA.default_options
+ALL_IDS: Tuple[int, ...] = tuple(RAW_QUESTIONS)
+# Wrong options shown per question, capped by how many other questions exist
+N_DISTRACTORS: int = min(max(0, DEFAULT_OPTIONS - 1), max(0, len(ALL_IDS) - 1))
+
+
+@functools.cache
+def _warm_audio_url_cache() -> None:
+    """Resolve every audio path referenced by the questions once, off the request path.
+
+    Runs from the router lifespan rather than at import, so importing the module
+    (tests, tooling) does not stat the audio directory. Cached because the router
+    is mounted twice and each mount runs the lifespan.
+    """
+    # every file on disk maps to itself; only nominal paths that need the
+    # _country/_answer fallback go through _resolve_audio_url
+    for rel in _audio_index():
+        AUDIO_URL_CACHE[f"audio/{rel}"] = STATIC_URL_PREFIX + rel
+    for r in RAW_QUESTIONS.values():
+        for path in (r["prompt_audio"], r["answer_audio"]):
+            if path and path not in AUDIO_URL_CACHE:
+                AUDIO_URL_CACHE[path] = _resolve_audio_url(path)
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    _warm_audio_url_cache()
+    yield
+
+
+router = APIRouter(lifespan=lifespan)
+
+
+# Question selection and session seeds
+_RNG = random.Random()
+_choices = _RNG.choices
+_getrandbits = _RNG.getrandbits
+# Reseeded for every deterministic option draw; draws never await, so one
+# scratch generator is shared instead of allocating a new one per draw
+_OPTION_RNG = random.Random()
+
+
+def _draw_option_ids(seed: int, pos: int, qid: int) -> Tuple[int, ...]:
+    """Pick and order the options for one session position.
+
+    Deterministic in (seed, pos): sessions store only the seed and options are
+    redrawn whenever a question or answer is served.
+    """
+    rng = _OPTION_RNG
+    rng.seed(seed ^ (pos << 32))
+    # Draw one id more than needed from the shared pool and discard the correct
+    # id if it came up (else the surplus draw): a uniform ordered sample of the
+    # other questions without keeping a per-question pool
+    option_ids = rng.sample(ALL_IDS, N_DISTRACTORS + 1)
+    if qid in option_ids:
+        option_ids.remove(qid)
+    else:
+        option_ids.pop()
+    # sample() already returns distractors in random order, so dropping the
+    # correct id at a random position gives a uniformly shuffled option list
+    option_ids.insert(rng.randint(0, len(option_ids)), qid)
+    # hashable, so the draw can key the _build_question cache
+    return tuple(option_ids)
+
+
+QUESTION_CACHE_CONTROL = "private, max-age=60"
+
+
+# (text, audio) of a question when it is shown as an option to another one
+_option_fields = operator.itemgetter("answer", "answer_audio")
+
+
+@functools.lru_cache(maxsize=1024)
+def _build_question(qid: int, option_ids: Tuple[int, ...]) -> Question:
+    """Expand a session position (question id + option ids) into a Question.
+
+    Question is frozen, so one instance is shared by every caller with the same
+    draw: a position's get_question and submit_answer build it only once.
+    """
+    raw = RAW_QUESTIONS
+    r = raw[qid]
+    # option ids are drawn from ALL_IDS, so they are always present;
+    # one pass yields (text, audio) pairs that zip() splits into the two tuples
+    option_texts, option_audios = zip(*[_option_fields(raw[option_qid]) for option_qid in option_ids])
+    return Question(
+        id=qid,
+        prompt_text=r["prompt_text"],
+        prompt_audio=r["prompt_audio"],
+        option_texts=option_texts,
+        option_audios=option_audios,
+        correct_option_id=option_ids.index(qid) + 1,
+    )
 
 
 def _get_session_or_404(sid: UUID) -> QuizSession:
-    s = SESSIONS.get(sid)
+    s = SESSIONS.get(sid) or FINISHED_SESSIONS.get(sid)
     if not s:
         raise HTTPException(404, "Session not found")
     return s
 
 
 @router.post("/quiz/start", response_model=StartQuizOut)
-def start_quiz(payload: StartQuizIn):
-    all_ids = list(RAW_QUESTIONS.keys())
-    if not all_ids:
+async def start_quiz(payload: StartQuizIn):
+    if not ALL_IDS:
         raise HTTPException(500, "No questions configured on the server")
     n = max(1, int(payload.n_questions))
-    chosen_ids = random.choices(all_ids, k=n)
+    chosen_ids = _choices(ALL_IDS, k=n)
 
     session = QuizSession(
         session_id=uuid4(),
         user_id=payload.user_id,
         question_ids=chosen_ids,
+        seed=_getrandbits(32),
     )
 
-    for pos, qid in enumerate(chosen_ids):
-        r = RAW_QUESTIONS[qid]
-        prompt = r.get("prompt_text")
-
-        try:
-            default_options = int(r.get("default_options", 4))
-        except Exception:
-            default_options = 4
-
-        option_ids = [qid]
-        remaining_ids = [other for other in all_ids if other != qid]
-        random.shuffle(remaining_ids)
-        option_ids.extend(remaining_ids[: max(0, default_options - 1)])
-        random.shuffle(option_ids)
-
-        opts: List[Card] = []
-        correct_idx = 1
-        for idx, option_qid in enumerate(option_ids, start=1):
-            answer_data = RAW_QUESTIONS.get(option_qid, {})
-            option_text = answer_data.get("answer")
-            audio_path = f"audio/q{option_qid}_answer.mp3" if option_qid else None
-            opts.append(Card(id=idx, text=option_text, audio=audio_path))
-            if option_qid == qid:
-                correct_idx = idx
-
-        prompt_card = Card(id=qid, text=prompt, audio=r.get("prompt_audio"))
-        session.question_map[pos] = Question(
-            id=qid,
-            prompt_text=prompt,
-            question=prompt_card,
-            options=opts,
-            correct_option_id=correct_idx,
-        )
-
     SESSIONS[session.session_id] = session
-    return StartQuizOut(
+    return StartQuizOut.model_construct(
         session_id=session.session_id,
         total=len(chosen_ids),
         first_question_id=chosen_ids[0],
@@ -148,35 +261,40 @@ def start_quiz(payload: StartQuizIn):
 
 
 @router.get("/quiz/question/{session_id}/{index}", response_model=QuestionOut)
-def get_question(session_id: UUID, index: int):
+async def get_question(session_id: UUID, index: int, request: Request, response: Response):
     session = _get_session_or_404(session_id)
     if session.finished:
         raise HTTPException(400, "Quiz already finished")
     if not (0 <= index < len(session.question_ids)):
         raise HTTPException(400, "Index out of range")
-    q = session.question_map.get(index)
-    if not q:
-        raise HTTPException(500, "Session question not prepared")
-    option_responses = []
-    for opt in q.options:
-        audio_path = opt.audio
-        option_responses.append(OptionResponse(
-            number=opt.id,
-            audio_url=_audio_url(audio_path)
-        ))
-    return QuestionOut(
+    # A question's body never changes for the lifetime of its session
+    etag = f'W/"{session_id}-{index}"'
+    cache_headers = {"ETag": etag, "Cache-Control": QUESTION_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=cache_headers)
+    response.headers.update(cache_headers)
+    qid = session.question_ids[index]
+    q = _build_question(qid, _draw_option_ids(session.seed, index, qid))
+    # Response objects are built from server data; FastAPI still checks them
+    # against response_model when serializing, so skip the first validation
+    option_responses = [
+        OptionResponse.model_construct(number=number, audio_url=_audio_url(audio))
+        for number, audio in enumerate(q.option_audios, start=1)
+    ]
+    return QuestionOut.model_construct(
         session_id=session.session_id,
         index=index,
         total=len(session.question_ids),
         question_id=q.id,
         prompt_text=q.prompt_text,
-        prompt_audio_url=_audio_url(q.question.audio),
+        prompt_audio_url=_audio_url(q.prompt_audio),
         options=option_responses,
     )
 
 
 @router.post("/quiz/answer", response_model=AnswerOut)
-def submit_answer(payload: AnswerIn):
+async def submit_answer(payload: AnswerIn, response: Response):
+    response.headers["Cache-Control"] = "no-store"
     session = _get_session_or_404(payload.session_id)
     if session.finished:
         raise HTTPException(400, "Quiz already finished")
@@ -185,26 +303,23 @@ def submit_answer(payload: AnswerIn):
     expected_qid = session.question_ids[session.current_index]
     if expected_qid != payload.question_id:
         raise HTTPException(400, "Question order mismatch")
-    q = session.question_map.get(session.current_index)
-    if not q:
-        raise HTTPException(400, "Question not found in session")
+    q = _build_question(expected_qid, _draw_option_ids(session.seed, session.current_index, expected_qid))
     is_correct = (payload.selected_option_id == q.correct_option_id)
-    session.answers[q.id] = is_correct
+    session.details.append(
+        {"question_id": str(q.id), "result": "correct" if is_correct else "wrong"}
+    )
     if is_correct:
         session.correct_count += 1
     session.current_index += 1
     if session.current_index >= len(session.question_ids):
         session.finished = True
-    correct_opt = next(o for o in q.options if o.id == q.correct_option_id)
-    country = None
-    raw_q = RAW_QUESTIONS.get(q.id)
-    if raw_q:
-        country = raw_q.get("country")
-    return AnswerOut(
+        FINISHED_SESSIONS[session.session_id] = SESSIONS.pop(session.session_id, session)
+    country = RAW_QUESTIONS[q.id]["country"]
+    return AnswerOut.model_construct(
         correct=is_correct,
-        correct_option_id=correct_opt.id,
-        correct_option_text=correct_opt.text,
-        correct_option_audio_url=_audio_url(correct_opt.audio),
+        correct_option_id=q.correct_option_id,
+        correct_option_text=q.correct_option_text,
+        correct_option_audio_url=_audio_url(q.correct_option_audio),
         country=country,
         score=session.correct_count,
         index=min(session.current_index, len(session.question_ids) - 1),
@@ -214,14 +329,20 @@ def submit_answer(payload: AnswerIn):
 
 
 @router.get("/quiz/summary/{session_id}", response_model=SummaryOut)
-def summary(session_id: UUID):
+async def summary(session_id: UUID):
     session = _get_session_or_404(session_id)
-    return SummaryOut(
-        session_id=session.session_id,
-        total=len(session.question_ids),
-        correct_count=session.correct_count,
-        details=[
-            {"question_id": str(qid), "result": "correct" if session.answers.get(qid) else "wrong"}
-            for qid in session.question_ids
-        ],
-    )
+    details = session.details
+    # positions not answered yet are reported as wrong
+    answered = len(details)
+    if answered < len(session.question_ids):
+        details = details + [
+            {"question_id": str(qid), "result": "wrong"}
+            for qid in session.question_ids[answered:]
+        ]
+    # Plain data built server-side; encode directly instead of validating SummaryOut
+    return ORJSONResponse({
+        "session_id": str(session.session_id),
+        "total": len(session.question_ids),
+        "correct_count": session.correct_count,
+        "details": details,
+    }, headers={"Cache-Control": "no-store"})
@@ -1,39 +1,49 @@
 from __future__ import annotations
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from dataclasses import dataclass, field
+from pydantic import BaseModel
+from typing import List, Dict, Optional, Tuple, Union
 from uuid import UUID
 import os
 
 
-class Card(BaseModel):
+@dataclass(slots=True, frozen=True)
+class Question:
+    """Server-side view of one session position; built from trusted data, never validated."""
     id: int
-    text: str
-    audio: Optional[str] = None  # путь к аудио варианта
-    image: Optional[str] = None  # путь к изображению варианта
+    prompt_text: str
+    prompt_audio: Optional[str]  # путь к аудио вопроса
+    # варианты хранятся параллельными кортежами: i-й текст и i-е аудио — вариант i+1
+    option_texts: Tuple[str, ...]
+    option_audios: Tuple[Optional[str], ...]
+    correct_option_id: int  # номер варианта, 1-based
 
+    @property
+    def correct_option_text(self) -> str:
+        return self.option_texts[self.correct_option_id - 1]
 
-class Question(BaseModel):
-    id: int
-    prompt_text: str
-    question: Card
-    options: List[Card]
-    correct_option_id: int
+    @property
+    def correct_option_audio(self) -> Optional[str]:
+        return self.option_audios[self.correct_option_id - 1]
 
 
-class QuizSession(BaseModel):
+@dataclass(slots=True)
+class QuizSession:
+    """Server-side quiz state; never parsed from client input, so not a Pydantic model."""
     session_id: UUID
-    user_id: str
+    user_id: Union[int, str]
     question_ids: List[int]
+    # options for each position are redrawn from this seed on demand
+    # (see nationalities router _draw_option_ids) instead of being stored
+    seed: int
     current_index: int = 0
     correct_count: int = 0
     finished: bool = False
-    answers: Dict[int, bool] = Field(default_factory=dict)  # question_id -> correct?
-    # per-session Question objects keyed by position index (0..n-1)
-    question_map: Dict[int, Question] = Field(default_factory=dict)
+    # строки summary, по одной на отвеченную позицию: {question_id, result}
+    details: List[Dict[str, str]] = field(default_factory=list)
 
 
 class StartQuizIn(BaseModel):
-    user_id: str
+    user_id: Union[int, str]  # Telegram id приходит числом, str — для остальных клиентов
     # Default number of questions may be set via env N_QUESTIONS
     n_questions: int = int(os.environ.get("N_QUESTIONS", 10))
 
@@ -13,11 +13,14 @@ For each question the script generates two MP3 files:
 If an item has an 'audio' field the script will reuse its stem as a base name.
 Otherwise files are named using the question id (e.g. q1_answer.mp3, q1_country.mp3).
 """
-import json
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
+import orjson
+
 from backend.src.utils import text_to_mp3
 from config import settings
 
@@ -28,9 +31,32 @@ if not AUDIO_DIR.is_absolute():
     AUDIO_DIR = Path.cwd() / AUDIO_DIR
 
 
+# Concurrent TTS requests
+MAX_WORKERS = 16
+
+
 def load_json(path: Path) -> Any:
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    return orjson.loads(path.read_bytes())
+
+
+def gen_one(text: str, path: Path, lang: str) -> str:
+    """Synthesize one file; returns 'created' or 'failed'."""
+    try:
+        # backend.src.utils.text_to_mp3 requires a filename arg; derive it from path
+        generated = text_to_mp3(
+            text,
+            path.stem,
+            lang,
+            out_path=path,
+            cache_dir=settings.TTS_CACHE_DIR,
+            retries=settings.TTS_RETRIES,
+            max_concurrency=settings.TTS_CONCURRENCY,
+        )
+        print(f"Created: {generated}")
+        return "created"
+    except Exception as e:
+        print(f"Failed to create {path}: {e}")
+        return "failed"
 
 
 def main():
@@ -55,13 +81,27 @@ def main():
         print("Unsupported JSON structure - expected list or object with 'questions'.")
         raise SystemExit(2)
 
-    created = 0
     skipped = 0
+    # (text, path) pairs to synthesize; run in a thread pool once collected
+    tasks: list[tuple[str, Path]] = []
+    # set when an item's audio field changes, so no-op runs leave the JSON untouched
+    dirty = False
+
+    # One directory listing instead of a stat() per generated file
+    AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+    existing = {entry.name for entry in os.scandir(AUDIO_DIR)}
+
+    def add_task(text: str, path: Path) -> None:
+        nonlocal skipped
+        if path.name in existing:
+            print(f"Exists, skipping: {path}")
+            skipped += 1
+            return
+        tasks.append((text, path))
 
     for idx, item in enumerate(items, start=1):
         # Use q{ID} as base name for all generated audio files to keep naming consistent
         qid = item.get("id") or idx
-        audio_rel = item.get("audio")  # original (if any) - we'll overwrite below
 
         # Get the text content
         answer_text = item.get("answer")
@@ -79,56 +119,43 @@ def main():
         answer_path = AUDIO_DIR / f"{audio_name}_answer.mp3"
         country_path = AUDIO_DIR / f"{audio_name}_country.mp3"
 
-        def gen_one(text: str, path: Path) -> bool:
-            nonlocal created, skipped
-            if not text:
-                print(f"No text for {path.name}")
-                skipped += 1
-                return False
-            if path.exists():
-                print(f"Exists, skipping: {path}")
-                skipped += 1
-                return False
-
-            path.parent.mkdir(parents=True, exist_ok=True)
-            try:
-                # backend.src.utils.text_to_mp3 requires a filename arg; derive it from path
-                filename = path.stem
-                # use configured TTS language
-                generated = text_to_mp3(text, filename, settings.TTS_LANG, out_path=path)
-                print(f"Created: {generated}")
-                created += 1
-                return True
-            except Exception as e:
-                print(f"Failed to create {path}: {e}")
-                return False
-
         # Generate files for available texts
         if answer_text:
-            gen_one(answer_text, answer_path)
+            add_task(answer_text, answer_path)
         else:
             print(f"No answer text for item {qid}")
             skipped += 1
 
         if country_text:
-            gen_one(country_text, country_path)
+            add_task(country_text, country_path)
         else:
             print(f"No country text for item {qid}")
             skipped += 1
 
         # Update the item's audio field to point to the canonical base (so backend can resolve _answer/_country)
         # We store the .mp3 value; backend._audio_url will try variants like _answer/_country
-        if isinstance(data, dict) and data.get("questions") is items:
-            item["audio"] = f"audio/{audio_name}.mp3"
-        elif isinstance(data, list):
-            item["audio"] = f"audio/{audio_name}.mp3"
+        audio_value = f"audio/{audio_name}.mp3"
+        if item.get("audio") != audio_value:
+            item["audio"] = audio_value
+            dirty = True
+
+    # TTS calls are network-bound, so overlap them in threads
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        results = list(pool.map(lambda t: gen_one(*t, settings.TTS_LANG), tasks))
+    created = results.count("created")
 
     print(f"Done. Created: {created}, Skipped: {skipped}")
 
-    # Persist changes to JSON (update audio fields)
+    if not dirty:
+        print(f"Audio paths already up to date: {json_path}")
+        return
+
+    # Persist changes to JSON (update audio fields); write a temp file and swap
+    # it in so an interrupted run never leaves a truncated questions file
     try:
-        with json_path.open("w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        tmp_path = json_path.with_suffix(json_path.suffix + ".tmp")
+        tmp_path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_path, json_path)
         print(f"Updated JSON file with audio paths: {json_path}")
     except Exception as e:
         print(f"Failed to update JSON file: {e}")
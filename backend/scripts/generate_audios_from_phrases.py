@@ -17,19 +17,30 @@ in the audio output directory configured in `config.settings`.
 from __future__ import annotations
 
 import argparse
-import json
+import os
 import re
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
+
+import orjson
 
 from config import settings
 from backend.src.utils import text_to_mp3
 
 
+# Concurrent TTS requests
+MAX_WORKERS = 16
+
+# safe_stem patterns, compiled once
+_WS = re.compile(r"\s+")
+_BAD = re.compile(r"[^a-z0-9_\-]")
+
+
 def load_phrases(path: Path) -> List[str]:
-    with path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = orjson.loads(path.read_bytes())
 
     if isinstance(data, dict) and "phrases" in data:
         phrases = data["phrases"]
@@ -49,8 +60,8 @@ def safe_stem(text: str, max_len: int = 40) -> str:
     """Create a filesystem-safe stem from text; fallback to hash when necessary."""
     s = text.strip().lower()
     # replace spaces with underscores and remove undesirable chars
-    s = re.sub(r"\s+", "_", s)
-    s = re.sub(r"[^a-z0-9_\-]", "", s)
+    s = _WS.sub("_", s)
+    s = _BAD.sub("", s)
     if not s:
         h = hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
         return f"tts_{h}"
@@ -59,6 +70,36 @@ def safe_stem(text: str, max_len: int = 40) -> str:
     return s
 
 
+def _worker(job: Tuple[int, str], out_dir: str, force: bool) -> str:
+    """Synthesize one phrase; returns 'created', 'skipped' or 'failed'."""
+    idx, phrase = job
+    stem = safe_stem(phrase)
+    # ensure uniqueness by prefixing index if needed
+    filename = f"{idx:02d}_{stem}"
+    # plain str paths: no Path objects per phrase
+    out_path = os.path.join(out_dir, f"{filename}.mp3")
+
+    if not force and os.path.exists(out_path):
+        print(f"Exists, skipping: {out_path}")
+        return "skipped"
+
+    try:
+        generated = text_to_mp3(
+            phrase,
+            filename,
+            settings.TTS_LANG,
+            out_path=out_path,
+            cache_dir=settings.TTS_CACHE_DIR,
+            retries=settings.TTS_RETRIES,
+            max_concurrency=settings.TTS_CONCURRENCY,
+        )
+    except Exception as e:
+        print(f"Failed to generate for phrase #{idx}: {e}")
+        return "failed"
+    print(f"Created: {generated}")
+    return "created"
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("json_path", type=Path, help="Path to phrases JSON file")
@@ -85,26 +126,13 @@ def main() -> None:
     out_dir = audio_base / folder_name
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    created = 0
-    skipped = 0
-
-    for idx, phrase in enumerate(phrases, start=1):
-        stem = safe_stem(phrase)
-        # ensure uniqueness by prefixing index if needed
-        filename = f"{idx:02d}_{stem}"
-        out_path = out_dir / f"{filename}.mp3"
-
-        if out_path.exists() and not args.force:
-            print(f"Exists, skipping: {out_path}")
-            skipped += 1
-            continue
-
-        try:
-            generated = text_to_mp3(phrase, filename, settings.TTS_LANG, out_path=out_path)
-            print(f"Created: {generated}")
-            created += 1
-        except Exception as e:
-            print(f"Failed to generate for phrase #{idx}: {e}")
+    # gTTS blocks on network I/O (releasing the GIL), so each worker thread
+    # handles one phrase start to finish, as in generate_audios_from_json
+    worker = partial(_worker, out_dir=os.fspath(out_dir), force=args.force)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        results = list(pool.map(worker, enumerate(phrases, start=1)))
+    created = results.count("created")
+    skipped = results.count("skipped")
 
     print(f"Done. Created: {created}, Skipped: {skipped}. Files are in: {out_dir}")
 
@@ -2,20 +2,81 @@
 
 Provides a simple helper to generate MP3 pronunciation files.
 """
+import functools
+import hashlib
+import os
+import random
+import shutil
+import threading
+import time
 from pathlib import Path
 from typing import Optional, Union
 
 try:
-    from gtts import gTTS
+    from gtts import gTTS, gTTSError
 except Exception:  # pragma: no cover - imported at runtime
     gTTS = None
 
+    class gTTSError(Exception):
+        pass
+
+
+@functools.cache
+def _tts_slots(max_concurrency: int) -> threading.BoundedSemaphore:
+    """Caps concurrent gTTS requests across all threads of the process, so parallel
+    generators do not get throttled by translate.google.com."""
+    return threading.BoundedSemaphore(max_concurrency)
+
+
+def _is_transient(error: gTTSError) -> bool:
+    # no response (network failure), rate limiting or a server-side error
+    status = getattr(getattr(error, "rsp", None), "status_code", None)
+    return status is None or status == 429 or status >= 500
+
+
+def _save_with_retry(text: str, lang: str, path: Path, retries: int, max_concurrency: int) -> None:
+    slots = _tts_slots(max_concurrency)
+    attempts = max(1, retries)
+    for attempt in range(attempts):
+        try:
+            with slots:
+                gTTS(text=text, lang=lang).save(str(path))
+            return
+        except gTTSError as e:
+            # bad language/text and other permanent failures are raised at once
+            if attempt == attempts - 1 or not _is_transient(e):
+                raise
+        # exponential backoff with jitter, outside the semaphore
+        time.sleep(0.5 * 2 ** attempt + random.random())
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _synthesize(text: str, lang: str, path: Path, retries: int, max_concurrency: int) -> None:
+    if gTTS is None:
+        raise RuntimeError(
+            "gTTS is not installed. Add 'gTTS' to your requirements and install it."
+        )
+    # save next to the target and swap it in, so a failed download never
+    # leaves a truncated file that later runs would treat as done
+    tmp = _tmp_path(path)
+    try:
+        _save_with_retry(text, lang, tmp, retries, max_concurrency)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
 
 def text_to_mp3(
     text: str,
     filename: str,
     lang: str,
     out_path: Union[str, Path],
+    cache_dir: Optional[Union[str, Path]] = None,
+    retries: int = 5,
+    max_concurrency: int = 8,
 ) -> Path:
     """Generate an MP3 file pronouncing `text` using gTTS.
 
@@ -24,6 +85,10 @@ def text_to_mp3(
         filename: Optional file name (without extension). If omitted a safe name is generated.
         lang: Language code for TTS (default 'fr').
         out_path: Path where the MP3 file should be saved. Can be a directory or full filepath.
+        cache_dir: Optional content-addressed cache of synthesized MP3s. A phrase already
+            synthesized for `lang` is copied from here instead of calling gTTS.
+        retries: Attempts per phrase on transient gTTS failures (network, 429, 5xx).
+        max_concurrency: Process-wide limit on simultaneous gTTS requests.
 
     Returns:
         Path to the generated MP3 file.
@@ -31,11 +96,6 @@ def text_to_mp3(
     Raises:
         RuntimeError: if gTTS is not installed or generation fails.
     """
-    if gTTS is None:
-        raise RuntimeError(
-            "gTTS is not installed. Add 'gTTS' to your requirements and install it."
-        )
-
     if not text:
         raise ValueError("text must be non-empty")
 
@@ -47,8 +107,6 @@ def text_to_mp3(
         out_p.mkdir(parents=True, exist_ok=True)
         safe_name = (filename or "").strip()
         if not safe_name:
-            import hashlib
-
             h = hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
             safe_name = f"tts_{h}"
         out_p = out_p / f"{safe_name}.mp3"
@@ -56,7 +114,23 @@ def text_to_mp3(
         # ensure parent exists
         out_p.parent.mkdir(parents=True, exist_ok=True)
 
-    tts = gTTS(text=text, lang=lang)
-    tts.save(str(out_p))
+    if cache_dir is None:
+        # no cache: always synthesize, an existing out_p may hold audio for older text
+        _synthesize(text, lang, out_p, retries, max_concurrency)
+        return out_p
 
+    key = hashlib.sha1(f"{lang}\0{text}".encode("utf-8")).hexdigest()
+    cached = Path(cache_dir) / key[:2] / f"{key}.mp3"
+    if not cached.exists():
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        _synthesize(text, lang, cached, retries, max_concurrency)
+
+    # copy through a tmp file too, so an interrupted copy never looks like a finished one
+    tmp = _tmp_path(out_p)
+    try:
+        shutil.copyfile(cached, tmp)
+        os.replace(tmp, out_p)
+    finally:
+        tmp.unlink(missing_ok=True)
     return out_p
+
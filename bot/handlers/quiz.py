@@ -5,29 +5,77 @@ from aiogram.types import ReplyKeyboardRemove, InlineKeyboardMarkup, InlineKeybo
 from aiogram.utils.callback_data import CallbackData
 import aiohttp
 import asyncio
+from cachetools import TTLCache
+from typing import Optional
 from ..states import QuizStates
 import logging
+from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+@dataclass(slots=True)
+class QuizSession:
+    questions: list
+    current: int = 0
+    correct: int = 0
+
+
 # Simple in-memory per-user quiz sessions. For production use persistent storage.
-SESSIONS = {}
+# Bounded with a TTL so quizzes abandoned before the summary do not leak.
+SESSIONS: TTLCache = TTLCache(maxsize=10000, ttl=3600)
 
 # callback data factory: q{index}_{option}
 quiz_cb = CallbackData("quiz", "idx", "opt")
 
+# Strong references to fire-and-forget tasks so they are not collected mid-run
+_BG_TASKS: set = set()
+
+
+def _on_task_done(task: asyncio.Task) -> None:
+    _BG_TASKS.discard(task)
+    # retrieve the exception so a failed background send is logged, not lost
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background quiz task failed", exc_info=task.exception())
+
 
 def register_handlers(dp: Dispatcher):
+    """Register quiz handlers.
+
+    The dispatcher has no shutdown hooks of its own, so whoever starts polling
+    must also pass close_session, e.g. executor.start_polling(dp, on_shutdown=close_session).
+    """
     dp.register_message_handler(start_quiz, lambda m: m.text == "Начать викторину")
     dp.register_callback_query_handler(handle_answer, lambda c: c.data and c.data.startswith("quiz:"))
 
 
+# Shared HTTP session: reuses connections (and cached DNS) across quiz starts.
+# Created lazily inside the running loop; closed by close_session() (see register_handlers).
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+
+async def _session() -> aiohttp.ClientSession:
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=50, ttl_dns_cache=300, keepalive_timeout=60)
+        )
+    return _SESSION
+
+
+async def close_session(*_args):
+    """Close the shared HTTP session (usable as an executor on_shutdown hook)."""
+    global _SESSION
+    if _SESSION is not None:
+        await _SESSION.close()
+        _SESSION = None
+
+
 async def fetch_quiz_questions(api_url: str, count: int = 10):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{api_url.rstrip('/')}/quiz/start?count={count}") as resp:
-            if resp.status != 200:
-                raise RuntimeError(f"Failed to fetch quiz questions: {resp.status}")
-            return await resp.json()
+    session = await _session()
+    async with session.get(f"{api_url.rstrip('/')}/quiz/start?count={count}") as resp:
+        if resp.status != 200:
+            raise RuntimeError(f"Failed to fetch quiz questions: {resp.status}")
+        return await resp.json()
 
 
 async def start_quiz(message: types.Message):
@@ -50,12 +98,7 @@ async def start_quiz(message: types.Message):
 
     user_id = message.from_user.id
     # initialize session
-    SESSIONS[user_id] = {
-        "questions": questions,
-        "current": 0,
-        "correct": 0,
-        "answers": [],
-    }
+    SESSIONS[user_id] = QuizSession(questions=questions)
 
     await QuizStates.in_quiz.set()
     await send_question(message.chat.id, message.bot, user_id)
@@ -65,8 +108,8 @@ async def send_question(chat_id: int, bot: types.Bot, user_id: int):
     session = SESSIONS.get(user_id)
     if not session:
         return
-    idx = session["current"]
-    questions = session["questions"]
+    idx = session.current
+    questions = session.questions
     if idx >= len(questions):
         # finished
         await send_summary(chat_id, bot, user_id)
@@ -105,15 +148,12 @@ async def handle_answer(callback: types.CallbackQuery, state: FSMContext):
         return
 
     try:
-        parts = data.split(":", 2)
-        if len(parts) < 3:
-            await callback.answer("Неправильный ответ")
-            return
-        _, idx_s, opt = parts
-        idx = int(idx_s)
-    except Exception:
+        parsed = quiz_cb.parse(data)
+        idx = int(parsed["idx"])
+    except ValueError:
         await callback.answer("Неправильные данные")
         return
+    opt = parsed["opt"]
 
     user_id = callback.from_user.id
     session = SESSIONS.get(user_id)
@@ -122,19 +162,18 @@ async def handle_answer(callback: types.CallbackQuery, state: FSMContext):
         return
 
     # Ensure the callback is for the current question
-    if idx != session["current"]:
+    if idx != session.current:
         await callback.answer("Этот вопрос уже обработан или не текущий.")
         return
 
-    q = session["questions"][idx]
+    q = session.questions[idx]
     correct = q.get("answer")
     chosen = opt
 
     # record answer
     is_correct = (chosen == correct)
-    session["answers"].append({"idx": idx, "chosen": chosen, "correct": correct, "ok": is_correct})
     if is_correct:
-        session["correct"] += 1
+        session.correct += 1
 
     # Provide immediate feedback by editing the message or sending a new one
     if is_correct:
@@ -143,31 +182,31 @@ async def handle_answer(callback: types.CallbackQuery, state: FSMContext):
         await callback.message.answer(f"❌ Неправильно. Правильный ответ: {correct}")
 
     # increment and send next question or summary
-    session["current"] += 1
+    session.current += 1
     await callback.answer()  # remove 'loading' on button
 
-    # small delay to avoid flooding
-    await asyncio.sleep(0.3)
-
-    if session["current"] < len(session["questions"]):
+    if session.current < len(session.questions):
         await send_question(callback.message.chat.id, callback.bot, user_id)
     else:
-        await send_summary(callback.message.chat.id, callback.bot, user_id)
+        # the summary does not need to hold up the callback; send it in the background
+        task = asyncio.create_task(send_summary(callback.message.chat.id, callback.bot, user_id))
+        _BG_TASKS.add(task)
+        task.add_done_callback(_on_task_done)
 
 
 async def send_summary(chat_id: int, bot: types.Bot, user_id: int):
     session = SESSIONS.get(user_id)
     if not session:
         return
-    correct = session["correct"]
-    total = len(session["questions"])
+    correct = session.correct
+    total = len(session.questions)
     kb = InlineKeyboardMarkup()
     kb.add(InlineKeyboardButton("Пройти снова", callback_data="quiz:restart"))
 
     await bot.send_message(chat_id, f"Квиз завершён. Правильных ответов: {correct}/{total}", reply_markup=kb)
 
-    # clear session
-    del SESSIONS[user_id]
+    # clear session (it may already have expired)
+    SESSIONS.pop(user_id, None)
     # finish FSM
     try:
         await QuizStates.in_quiz.finish()
@@ -1,20 +1,22 @@
-import os
 import asyncio
+import functools
+import logging
 from typing import Dict, Any, Optional
 
-from aiogram import Bot, Dispatcher, F, types
+from aiogram import Bot, Dispatcher, types
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
 from aiogram.filters import CommandStart
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, InputMediaAudio, Update
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 
 from fastapi import FastAPI, Request
-from aiogram.types import Update
-
-from config import settings
 
 import httpx
+import orjson
+from cachetools import LRUCache, TTLCache
 
 # Заменено: берём настройки из отдельного модуля конфигурации
 from config import settings
@@ -31,13 +33,97 @@ class QuizState(StatesGroup):
 #   "index": 0,
 #   "total": 10,
 #   "last_question_id": 1,
-#   "last_options": ["...", "...", "...", "..."]
+#   "last_option_numbers": [1, 2, 3, 4]
 # }
 
-dp = Dispatcher(storage=MemoryStorage())
+def build_storage():
+    # Redis переживает рестарт и общий для нескольких процессов бота; без REDIS_URL — память
+    if settings.REDIS_URL:
+        from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+
+        return RedisStorage.from_url(
+            settings.REDIS_URL, key_builder=DefaultKeyBuilder(with_bot_id=True)
+        )
+    return MemoryStorage()
+
+
+dp = Dispatcher(storage=build_storage())
 bot = Bot(settings.BOT_TOKEN)  # убрал deprecated аргумент parse_mode
 
+
+class TelegramRateLimit(BaseRequestMiddleware):
+    """Равномерно распределяет исходящие запросы (не больше `per_second` в секунду)
+    и один раз повторяет запрос после 429, выждав retry_after."""
+
+    def __init__(self, per_second: float = 30.0):
+        self._interval = 1.0 / per_second
+        self._next_slot = 0.0
+
+    async def __call__(self, make_request, bot, method):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        # занимаем следующий свободный слот; запросы встают в очередь, а не идут пачкой
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            return await make_request(bot, method)
+
+
+bot.session.middleware(TelegramRateLimit())
+
+# ===== Фоновые задачи =====
+logger = logging.getLogger(__name__)
+
+# Ссылки на фоновые задачи (предзагрузка, обработка апдейтов), чтобы их не собрал GC до завершения
+_BG_TASKS: set = set()
+
+
+def _on_task_done(error_message: str, task: asyncio.Task) -> None:
+    _BG_TASKS.discard(task)
+    # забираем исключение, даже если результат задачи никому не понадобился
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(error_message, exc_info=task.exception())
+
+
+def spawn(coro, error_message: str) -> asyncio.Task:
+    """Запустить корутину в фоне; ошибка не теряется, а пишется в лог."""
+    task = asyncio.create_task(coro)
+    _BG_TASKS.add(task)
+    task.add_done_callback(functools.partial(_on_task_done, error_message))
+    return task
+
+
 # ===== HTTP клиент =====
+# Один клиент на процесс: соединения с backend переиспользуются между запросами
+HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global HTTP_CLIENT
+    if HTTP_CLIENT is None:
+        headers = {}
+        if settings.API_TOKEN:
+            headers["Authorization"] = f"Bearer {settings.API_TOKEN}"
+        HTTP_CLIENT = httpx.AsyncClient(
+            timeout=20.0,
+            headers=headers,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return HTTP_CLIENT
+
+
+async def close_client() -> None:
+    global HTTP_CLIENT
+    if HTTP_CLIENT is not None:
+        await HTTP_CLIENT.aclose()
+        HTTP_CLIENT = None
+
+
 def build_url(path: str) -> str:
     # backend отдаёт /static/... и т.д. — нормализуем
     if path.startswith("http://") or path.startswith("https://"):
@@ -45,46 +131,60 @@ def build_url(path: str) -> str:
     return settings.API_BASE.rstrip("/") + "/" + path.lstrip("/")
 
 
+# Короткий кэш GET-ответов: вопросы сессии и итог не меняются, повторные нажатия не ходят в backend
+_GET_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=30)
+
+
 async def api_get(path: str) -> Dict[str, Any]:
-	headers = {}
-	if settings.API_TOKEN:
-		headers["Authorization"] = f"Bearer {settings.API_TOKEN}"
-	async with httpx.AsyncClient(timeout=20.0) as client:
-		r = await client.get(build_url(path), headers=headers)
-		r.raise_for_status()
-		return r.json()
+	cached = _GET_CACHE.get(path)
+	if cached is not None:
+		return cached
+	r = await get_client().get(build_url(path))
+	r.raise_for_status()
+	data = _GET_CACHE[path] = orjson.loads(r.content)
+	return data
+
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
 
 
 async def api_post(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-	headers = {}
-	if settings.API_TOKEN:
-		headers["Authorization"] = f"Bearer {settings.API_TOKEN}"
-	async with httpx.AsyncClient(timeout=20.0) as client:
-		r = await client.post(build_url(path), json=payload, headers=headers)
-		r.raise_for_status()
-		return r.json()
+	r = await get_client().post(
+		build_url(path), content=orjson.dumps(payload), headers=_JSON_HEADERS
+	)
+	r.raise_for_status()
+	return orjson.loads(r.content)
+
+
+# Аудио вопросов фиксировано по URL — держим последние файлы в памяти
+_AUDIO_CACHE: LRUCache = LRUCache(maxsize=128)
 
 
 async def fetch_bytes(url_or_path: Optional[str]) -> Optional[bytes]:
 	if not url_or_path:
 		return None
 	url = build_url(url_or_path)
-	headers = {}
-	if settings.API_TOKEN:
-		headers["Authorization"] = f"Bearer {settings.API_TOKEN}"
-	async with httpx.AsyncClient(timeout=30.0) as client:
-		r = await client.get(url, headers=headers)
-		r.raise_for_status()
-		return r.content
+	content = _AUDIO_CACHE.get(url)
+	if content is not None:
+		return content
+	r = await get_client().get(url, timeout=30.0)
+	r.raise_for_status()
+	content = _AUDIO_CACHE[url] = r.content
+	return content
 
 
 # ===== UI helpers =====
 def options_keyboard(options: list[dict]) -> InlineKeyboardMarkup:
+    return _numbers_keyboard(tuple(option.get("number", 1) for option in options))
+
+
+@functools.lru_cache(maxsize=64)
+def _numbers_keyboard(numbers: tuple[int, ...]) -> InlineKeyboardMarkup:
+    # клавиатура зависит только от номеров вариантов — строим один раз на набор
     # кнопки с номерами, callback_data вида "pick:NUMBER" (1..4)
     rows = []
     row = []
-    for option in options:
-        number = option.get("number", 1)
+    for number in numbers:
         button_text = f"{number}"  # показываем только номер
         row.append(InlineKeyboardButton(text=button_text, callback_data=f"pick:{number}"))
         if len(row) == 2:
@@ -95,24 +195,26 @@ def options_keyboard(options: list[dict]) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def restart_keyboard() -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="Сыграть снова", callback_data="restart")]
-    ])
-
+# Статичные клавиатуры — строим один раз при импорте
+RESTART_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="Сыграть снова", callback_data="restart")]
+])
 
-def next_keyboard() -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="Следующий вопрос", callback_data="next")]
-    ])
+NEXT_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="Следующий вопрос", callback_data="next")]
+])
 
 
 def modules_keyboard(modules: list[dict]) -> InlineKeyboardMarkup:
+    return _modules_keyboard(tuple((m.get("title") or m.get("slug"), m.get("slug")) for m in modules))
+
+
+@functools.lru_cache(maxsize=8)
+def _modules_keyboard(items: tuple[tuple[str, str], ...]) -> InlineKeyboardMarkup:
+    # список модулей почти не меняется — одна клавиатура на всех пользователей
     rows = []
     row = []
-    for m in modules:
-        title = m.get("title") or m.get("slug")
-        slug = m.get("slug")
+    for title, slug in items:
         row.append(InlineKeyboardButton(text=title, callback_data=f"module:{slug}"))
         if len(row) == 2:
             rows.append(row)
@@ -137,7 +239,7 @@ async def show_modules(chat_id: int, state: FSMContext) -> None:
         await bot.send_message(chat_id, "🚀 Начинаем квиз (по умолчанию).")
         try:
             started = await api_post("/quiz/start", {
-                "user_id": str(chat_id),
+                "user_id": chat_id,
                 "n_questions": settings.N_QUESTIONS
             })
         except Exception:
@@ -157,70 +259,134 @@ async def show_modules(chat_id: int, state: FSMContext) -> None:
 
 
 # ====== Показ вопроса ======
+# Предзагруженные вопросы: путь вопроса -> задача, возвращающая (вопрос, аудио вопроса, аудио вариантов)
+PREFETCHED: TTLCache = TTLCache(maxsize=1024, ttl=600)
+
+
+def public_audio_url(path: Optional[str]) -> Optional[str]:
+    # только относительные пути backend (/static/...) — абсолютные ссылки могут быть внутренними
+    if not path or not settings.PUBLIC_AUDIO_BASE or path.startswith(("http://", "https://")):
+        return None
+    return settings.PUBLIC_AUDIO_BASE.rstrip("/") + "/" + path.lstrip("/")
+
+
+# Путь аудио на backend -> file_id в Telegram: после первой отправки файл
+# переиспользуется без повторной загрузки
+FILE_IDS: LRUCache = LRUCache(maxsize=4096)
+
+
+def remember_file_id(url_or_path: Optional[str], message: Optional[types.Message]) -> None:
+    if url_or_path and message is not None and message.audio is not None:
+        FILE_IDS[url_or_path] = message.audio.file_id
+
+
+async def load_audio(url_or_path: Optional[str]) -> Optional[str | bytes]:
+    """file_id или ссылка, которую Telegram возьмёт сам, либо байты файла (None при ошибке)."""
+    if url_or_path in FILE_IDS:
+        return FILE_IDS[url_or_path]
+    url = public_audio_url(url_or_path)
+    if url:
+        return url
+    try:
+        return await fetch_bytes(url_or_path)
+    except Exception:
+        return None
+
+
+def audio_input(audio: str | bytes, filename: str) -> str | types.BufferedInputFile:
+    if isinstance(audio, str):
+        return audio
+    return types.BufferedInputFile(audio, filename=filename)
+
+
+async def fetch_question(path: str) -> tuple[Dict[str, Any], Optional[str | bytes], list[Optional[str | bytes]]]:
+    # GET /quiz/question/{session_id}/{index}, затем все аудио параллельно
+    q = await api_get(path)
+    prompt_audio, *option_audios = await asyncio.gather(
+        load_audio(q.get("prompt_audio_url")),
+        *(load_audio(opt.get("audio_url")) for opt in q.get("options", [])),
+    )
+    return q, prompt_audio, option_audios
+
+
+def prefetch_question(path: str) -> None:
+    """Загрузить вопрос в фоне, пока пользователь отвечает на текущий."""
+    if path not in PREFETCHED:
+        PREFETCHED[path] = spawn(fetch_question(path), f"Failed to prefetch {path}")
+
+
 async def show_question(chat_id: int, state: FSMContext) -> None:
     data = await state.get_data()
     session_id = data["session_id"]
     index = data["index"]
     module_base = data.get("module_base", "")  # например: "/modules/nationalities" или ""
 
-    # GET /quiz/question/{session_id}/{index}
-    q = await api_get(f"{module_base}/quiz/question/{session_id}/{index}")
+    path = f"{module_base}/quiz/question/{session_id}/{index}"
+    task = PREFETCHED.pop(path, None)
+    fetched = None
+    if task is not None:
+        try:
+            fetched = await task
+        except Exception:
+            fetched = None
+    if fetched is None:
+        fetched = await fetch_question(path)
+    q, prompt_audio, option_audios = fetched
 
     # сохраним данные для ответа
     await state.update_data(
         last_question_id=q["question_id"],
-        last_options=q["options"],
+        # для проверки ответа нужны только номера — не храним варианты целиком
+        last_option_numbers=[opt.get("number", i + 1) for i, opt in enumerate(q["options"])],
         total=q["total"],
     )
 
-    # сначала аудио вопроса (если есть)
-    if q.get("prompt_audio_url"):
-        audio_bytes = await fetch_bytes(q["prompt_audio_url"])
-        if audio_bytes:
-            await bot.send_audio(
-                chat_id,
-                types.BufferedInputFile(audio_bytes, filename="question.ogg"),
-                caption=f"<b>Вопрос {q['index']+1}/{q['total']}</b>\n{q['prompt_text']}",
-                parse_mode="HTML",
-            )
-        else:
-            await bot.send_message(
-                chat_id,
-                f"<b>Вопрос {q['index']+1}/{q['total']}</b>\n{q['prompt_text']}",
-                parse_mode="HTML",
-            )
-    else:
-        await bot.send_message(
+    # кнопки для выбора
+    kb = options_keyboard(q["options"])
+
+    # аудио вариантов одним запросом (альбом — от 2 до 10 файлов)
+    media = [
+        (
+            opt.get("audio_url"),
+            InputMediaAudio(
+                media=audio_input(audio, f"option_{opt.get('number', 1)}.ogg"),
+                caption=f"🔊 Вариант {opt.get('number', 1)}",
+            ),
+        )
+        for opt, audio in zip(q.get("options", []), option_audios)
+        if audio
+    ]
+    batches = [media[start:start + 10] for start in range(0, len(media), 10)]
+
+    # сначала вопрос (с аудио, если есть); клавиатуру цепляем к нему, а не
+    # отдельным сообщением — к альбому вариантов её прикрепить нельзя
+    caption = f"<b>Вопрос {q['index']+1}/{q['total']}</b>\n{q['prompt_text']}"
+    if q.get("prompt_audio_url") and prompt_audio:
+        sent = await bot.send_audio(
             chat_id,
-            f"<b>Вопрос {q['index']+1}/{q['total']}</b>\n{q['prompt_text']}",
+            audio_input(prompt_audio, "question.ogg"),
+            caption=caption,
             parse_mode="HTML",
+            reply_markup=kb,
         )
+        remember_file_id(q["prompt_audio_url"], sent)
+    else:
+        await bot.send_message(chat_id, caption, parse_mode="HTML", reply_markup=kb)
 
     # Не отсылаем аудиофайлы вариантов заранее — они будут проигрываться
     # только по выбору пользователя, чтобы не мешать и не запускаться сами.
-    # Отправляем короткое перечисление вариантов (номера) и клавиатуру выбора.
-    opt_numbers = [str(opt.get("number", i + 1)) for i, opt in enumerate(q.get("options", []))]
-    if opt_numbers:
-        for opt in q.get("options", []):
-            audio_url = opt.get("audio_url")
-            if not audio_url:
-                continue
-            try:
-                audio_bytes = await fetch_bytes(audio_url)
-            except Exception:
-                continue
-            if audio_bytes:
-                await bot.send_audio(
-                    chat_id,
-                    types.BufferedInputFile(
-                        audio_bytes, filename=f"option_{opt.get('number', 1)}.ogg"
-                    ),
-                    caption=f"🔊 Вариант {opt.get('number', 1)}",
-                )
+    for batch in batches:
+        if len(batch) == 1:
+            item = batch[0][1]
+            messages = [await bot.send_audio(chat_id, item.media, caption=item.caption)]
+        else:
+            messages = await bot.send_media_group(chat_id, [item for _, item in batch])
+        for (audio_url, _), sent in zip(batch, messages):
+            remember_file_id(audio_url, sent)
 
-    # кнопки для выбора
-    kb = options_keyboard(q["options"])
-    await bot.send_message(chat_id, "Выберите номер варианта:", reply_markup=kb)
+    # следующий вопрос грузим заранее — кнопка "Следующий вопрос" ответит сразу
+    if index + 1 < q["total"]:
+        prefetch_question(f"{module_base}/quiz/question/{session_id}/{index + 1}")
 
 
 # ====== START ======
@@ -231,10 +397,9 @@ async def start_cmd(m: types.Message, state: FSMContext):
     await show_modules(m.chat.id, state)
 
 
-@dp.callback_query(F.data.startswith("module:"))
 async def choose_module(cb: types.CallbackQuery, state: FSMContext):
     await cb.answer()
-    user_id = str(cb.from_user.id)
+    user_id = cb.from_user.id
     slug = cb.data.split(":", 1)[1]
 
     # строим базовый путь для выбранного модуля
@@ -281,7 +446,6 @@ async def choose_module(cb: types.CallbackQuery, state: FSMContext):
 
 
 # ====== Выбор варианта ======
-@dp.callback_query(F.data.startswith("pick:"))
 async def pick_option(cb: types.CallbackQuery, state: FSMContext):
     await cb.answer()  # мгновенная реакция
 
@@ -293,7 +457,7 @@ async def pick_option(cb: types.CallbackQuery, state: FSMContext):
     session_id = data["session_id"]
     index = data["index"]
     question_id = data["last_question_id"]
-    options = data["last_options"]
+    valid_numbers = data["last_option_numbers"]
 
     try:
         selected_option_id = int(cb.data.split(":")[1])  # 1..N (номер опции)
@@ -302,7 +466,6 @@ async def pick_option(cb: types.CallbackQuery, state: FSMContext):
         return
 
     # Проверяем что номер валидный
-    valid_numbers = [opt.get("number", 1) for opt in options]
     if selected_option_id not in valid_numbers:
         await cb.message.answer("Некорректный выбор.")
         return
@@ -345,13 +508,14 @@ async def pick_option(cb: types.CallbackQuery, state: FSMContext):
         # play correct answer audio if present
         if ans.get("correct_option_audio_url"):
             try:
-                audio_bytes = await fetch_bytes(ans["correct_option_audio_url"])
-                if audio_bytes:
-                    await bot.send_audio(
+                audio = await load_audio(ans["correct_option_audio_url"])
+                if audio:
+                    sent = await bot.send_audio(
                         cb.message.chat.id,
-                        types.BufferedInputFile(audio_bytes, filename="correct_answer.ogg"),
+                        audio_input(audio, "correct_answer.ogg"),
                         caption=f"🔊 {ans['correct_option_text']}",
                     )
+                    remember_file_id(ans["correct_option_audio_url"], sent)
             except Exception:
                 # non-fatal if playback fails
                 pass
@@ -364,7 +528,7 @@ async def pick_option(cb: types.CallbackQuery, state: FSMContext):
         await cb.message.answer(
             f"🏁 Квиз завершён!\n"
             f"Правильных ответов: <b>{summary['correct_count']}</b> из <b>{summary['total']}</b>",
-            reply_markup=restart_keyboard(),
+            reply_markup=RESTART_KB,
             parse_mode="HTML",
         )
         return
@@ -372,11 +536,10 @@ async def pick_option(cb: types.CallbackQuery, state: FSMContext):
         # перейти к следующему индексу, но НЕ показывать вопрос автоматически
         # — пользователь нажмёт кнопку "Следующий вопрос"
         await state.update_data(index=index + 1)
-        await cb.message.answer("Нажмите, чтобы перейти к следующему вопросу:", reply_markup=next_keyboard())
+        await cb.message.answer("Нажмите, чтобы перейти к следующему вопросу:", reply_markup=NEXT_KB)
 
 
 # ====== Рестарт ======
-@dp.callback_query(F.data == "restart")
 async def restart(cb: types.CallbackQuery, state: FSMContext):
     await cb.answer()
     # Возврат к выбору модуля
@@ -385,7 +548,6 @@ async def restart(cb: types.CallbackQuery, state: FSMContext):
 
 
 # Обработчик кнопки "Следующий вопрос"
-@dp.callback_query(F.data == "next")
 async def next_question(cb: types.CallbackQuery, state: FSMContext):
     await cb.answer()
     data = await state.get_data()
@@ -401,6 +563,26 @@ async def next_question(cb: types.CallbackQuery, state: FSMContext):
     # Показываем следующий вопрос (show_question использует текущий index из state)
     await show_question(cb.message.chat.id, state)
 
+
+# ====== Маршрутизация callback-кнопок ======
+# Один обработчик с таблицей по префиксу callback_data вместо цепочки фильтров
+_CB_DISPATCH = {
+    "pick": pick_option,
+    "module": choose_module,
+    "restart": restart,
+    "next": next_question,
+}
+
+
+@dp.callback_query()
+async def dispatch_callback(cb: types.CallbackQuery, state: FSMContext):
+    handler = _CB_DISPATCH.get((cb.data or "").partition(":")[0])
+    if handler is None:
+        # неизвестные данные (например кнопка из старой версии) — просто гасим «часики»
+        await cb.answer()
+        return
+    await handler(cb, state)
+
 app = FastAPI(title="WordQuiz Bot Webhook")
 
 @app.on_event("startup")
@@ -412,6 +594,7 @@ async def _on_startup():
 async def _on_shutdown():
     async with bot:
         await bot.delete_webhook(drop_pending_updates=True)
+    await close_client()
 
 @app.get("/health")
 async def health():
@@ -419,8 +602,10 @@ async def health():
 
 @app.post("/tg/webhook")
 async def tg_webhook(request: Request):
-    update = Update.model_validate(await request.json())
-    await dp.feed_update(bot, update)
+    update = Update.model_validate(orjson.loads(await request.body()))
+    # отвечаем Telegram сразу: обработка (аудио, несколько отправок) идёт в фоне,
+    # иначе медленный ответ вызывает повторную доставку апдейта
+    spawn(dp.feed_update(bot, update), "Failed to process update")
     return {"ok": True}
 
 
@@ -428,8 +613,17 @@ async def tg_webhook(request: Request):
 async def main():
     if not settings.BOT_TOKEN:
         raise RuntimeError("BOT_TOKEN is empty. Set it in .env")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await close_client()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop входит в uvicorn[standard]; без него (например, на Windows) — стандартный цикл
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
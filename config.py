@@ -1,4 +1,6 @@
+from functools import lru_cache
 from pathlib import Path
+from typing import cast
 import os
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -12,6 +14,11 @@ class Settings(BaseSettings):
     
     # Настройки для TTS (могут быть расширены позже)
     TTS_LANG: str = "fr"
+    # Кэш синтезированных MP3 по (язык, текст), чтобы не ходить в TTS повторно
+    TTS_CACHE_DIR: Path = Path('backend/data/tts_cache')
+    # Максимум одновременных запросов к TTS и число попыток при ошибках (429 и т.п.)
+    TTS_CONCURRENCY: int = 8
+    TTS_RETRIES: int = 5
     # Выбор поставщика TTS (например: 'google', 'gtts', 'azure')
     TTS_PROVIDER: str | None = None
     # Уровень логирования
@@ -23,6 +30,18 @@ class Settings(BaseSettings):
     API_TOKEN: str | None = os.environ.get("API_TOKEN", "")
     # Количество вопросов по умолчанию
     N_QUESTIONS: int = 20
+    # Время жизни сессии квиза на бэкенде (секунды) и максимум одновременных сессий
+    SESSION_TTL: int = 3600
+    SESSION_MAX_COUNT: int = 10000
+    # Сколько держать завершённую сессию (чтобы бот успел запросить итог)
+    SESSION_FINISHED_TTL: int = 300
+    # Cache-Control max-age для аудио из /static (секунды)
+    STATIC_CACHE_MAX_AGE: int = 86400
+    # Публичный адрес backend, откуда Telegram сам скачает /static/... (например https://domain.tld).
+    # Если задан, бот передаёт ссылку на аудио вместо скачивания и повторной загрузки файла
+    PUBLIC_AUDIO_BASE: str | None = None
+    # Redis для FSM-состояния бота (например redis://redis:6379/0). Пусто — хранение в памяти процесса
+    REDIS_URL: str | None = None
     # Токен Telegram-бота (устанавливается через .env как BOT_TOKEN)
     BOT_TOKEN: str | None = ""
     # URL вебхука для Telegram (если используется). Пример: https://domain.tld/tg/webhook
@@ -35,5 +54,27 @@ class Settings(BaseSettings):
     )
 
 
-# Создаем глобальный экземпляр настроек
-settings = Settings()
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Единственный экземпляр настроек; .env читается при первом обращении."""
+    return Settings()
+
+
+class _SettingsProxy:
+    """Подставляется вместо Settings: экземпляр создаётся при первом чтении атрибута."""
+
+    __slots__ = ()
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        # запись (в т.ч. monkeypatch.setattr в тестах) уходит в общий экземпляр
+        setattr(get_settings(), name, value)
+
+    def __repr__(self) -> str:
+        return repr(get_settings())
+
+
+# `from config import settings` по-прежнему работает, но импорт больше не читает .env
+settings: Settings = cast(Settings, _SettingsProxy())
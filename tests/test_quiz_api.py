@@ -67,6 +67,17 @@ def test_answer_flow_correct_and_summary():
     assert s_resp.status_code == 200
     s_data = s_resp.json()
     assert s_data["correct_count"] == 1
+    assert s_data["details"] == [{"question_id": str(qid), "result": "correct"}]
+
+
+def test_start_accepts_numeric_user_id():
+    from uuid import UUID
+    from backend.modules.nationalities import router as nat_router
+
+    resp = client.post("/quiz/start", json={"user_id": 123456789, "n_questions": 1})
+    assert resp.status_code == 200
+    session = nat_router.SESSIONS[UUID(resp.json()["session_id"])]
+    assert session.user_id == 123456789
 
 
 def test_answer_order_mismatch_and_incorrect():
@@ -100,3 +111,109 @@ def test_answer_order_mismatch_and_incorrect():
     assert a_resp.status_code == 200
     a_data = a_resp.json()
     assert a_data["correct"] is False
+
+
+def test_session_questions_round_trip():
+    from dataclasses import asdict
+    from uuid import UUID
+    from backend.modules.nationalities import router as nat_router
+    from backend.schemas import Question
+
+    resp = client.post("/quiz/start", json={"user_id": "user4", "n_questions": 3})
+    assert resp.status_code == 200
+    session = nat_router.SESSIONS[UUID(resp.json()["session_id"])]
+
+    for pos, qid in enumerate(session.question_ids):
+        q = nat_router._build_question(qid, nat_router._draw_option_ids(session.seed, pos, qid))
+        dumped = asdict(q)
+        assert Question(**dumped) == q
+        assert dumped["id"] == qid
+        assert len(dumped["option_texts"]) == len(dumped["option_audios"])
+        correct_text = dumped["option_texts"][q.correct_option_id - 1]
+        assert correct_text == nat_router.RAW_QUESTIONS[qid]["answer"]
+
+
+def test_question_etag_not_modified():
+    resp = client.post("/quiz/start", json={"user_id": "user5", "n_questions": 1})
+    session_id = resp.json()["session_id"]
+
+    first = client.get(f"/quiz/question/{session_id}/0")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = client.get(f"/quiz/question/{session_id}/0", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+
+def test_session_options_reproducible_from_seed():
+    from uuid import UUID
+    from backend.modules.nationalities import router as nat_router
+
+    resp = client.post("/quiz/start", json={"user_id": "user6", "n_questions": 5})
+    session_id = resp.json()["session_id"]
+    session = nat_router.SESSIONS[UUID(session_id)]
+
+    for pos, qid in enumerate(session.question_ids):
+        option_ids = nat_router._draw_option_ids(session.seed, pos, qid)
+        assert option_ids == nat_router._draw_option_ids(session.seed, pos, qid)
+        assert qid in option_ids
+        assert len(set(option_ids)) == len(option_ids)
+
+        served = client.get(f"/quiz/question/{session_id}/{pos}").json()["options"]
+        assert [o["audio_url"] for o in served] == [
+            nat_router._audio_url(nat_router.RAW_QUESTIONS[oid]["answer_audio"]) for oid in option_ids
+        ]
+
+
+def test_reload_audio_index_refreshes_urls(tmp_path, monkeypatch):
+    from backend.modules.nationalities import router as nat_router
+
+    monkeypatch.setattr(nat_router, "STATIC_ROOT_STR", str(tmp_path))
+    nat_router.reload_audio_index()
+    try:
+        # nothing on disk: falls back to the nominal path
+        assert nat_router._audio_url("audio/q1.mp3") == f"{nat_router.STATIC_URL_PREFIX}q1.mp3"
+
+        (tmp_path / "q1_country.mp3").write_bytes(b"")
+        nat_router.reload_audio_index()
+        assert nat_router._audio_url("audio/q1.mp3") == f"{nat_router.STATIC_URL_PREFIX}q1_country.mp3"
+    finally:
+        monkeypatch.undo()
+        nat_router.reload_audio_index()
+
+
+class _FakeTTS:
+    calls = 0
+
+    def __init__(self, text, lang):
+        self.text = text
+
+    def save(self, path):
+        type(self).calls += 1
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.text)
+
+
+def test_text_to_mp3_without_cache_regenerates(tmp_path, monkeypatch):
+    from backend.src.utils import tts
+
+    monkeypatch.setattr(tts, "gTTS", _FakeTTS)
+    out = tmp_path / "phrase.mp3"
+    tts.text_to_mp3("vieux texte", None, "fr", out_path=out)
+    tts.text_to_mp3("texte corrigé", None, "fr", out_path=out)
+    assert out.read_text(encoding="utf-8") == "texte corrigé"
+    assert list(tmp_path.iterdir()) == [out]
+
+
+def test_text_to_mp3_reuses_cache(tmp_path, monkeypatch):
+    from backend.src.utils import tts
+
+    monkeypatch.setattr(tts, "gTTS", _FakeTTS)
+    monkeypatch.setattr(_FakeTTS, "calls", 0)
+    cache = tmp_path / "cache"
+    a = tts.text_to_mp3("bonjour", None, "fr", out_path=tmp_path / "a.mp3", cache_dir=cache)
+    b = tts.text_to_mp3("bonjour", None, "fr", out_path=tmp_path / "b.mp3", cache_dir=cache)
+    assert _FakeTTS.calls == 1
+    assert a.read_text(encoding="utf-8") == b.read_text(encoding="utf-8") == "bonjour"
+    assert not list(tmp_path.glob("*.tmp"))